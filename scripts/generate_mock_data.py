@@ -8,17 +8,16 @@ Creates:
 3. Introduces random errors and discrepancies for testing
 """
 
-import csv
-import random
+import io
 import os
-from datetime import datetime, timedelta
-from decimal import Decimal
-from dotenv import load_dotenv
-import psycopg2
-from psycopg2.extras import execute_batch
+import pathlib
+from datetime import datetime
+from multiprocessing import Pool
+from typing import NamedTuple
+import numpy as np
 
-# Load environment variables
-load_dotenv()
+# psycopg2 and dotenv are imported inside the functions that need them, so
+# the data generation helpers can be imported without loading libpq
 
 # Configuration
 OUTPUT_DIR = "test/testdata"
@@ -27,24 +26,59 @@ NUM_BANK_FILES = 1
 ROWS_PER_BANK = NUM_TRANSACTIONS
 ERROR_RATE = 0.05  # 5% of rows will have errors
 
+# Transaction date range
+START_DATE = datetime(2024, 1, 1)
+END_DATE = datetime(2024, 12, 31)
+
 # Bank names
 BANKS = ["bank_bca"]
 
 # Transaction types
 TYPES = ["DEBIT", "CREDIT"]
 
-# Database configuration from .env
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5434'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'postgres'),
-    'database': os.getenv('DB_NAME', 'recon_db')
-}
+# Rows converted to Python objects at a time when formatting for Postgres
+COPY_CHUNK_ROWS = 64 * 1024
+
+# Bank CSV error kinds
+WRONG_FORMAT_AMOUNT, WRONG_FORMAT_DATE, MISSING_FIELD, AMOUNT_DISCREPANCY = range(4)
+
+# Database configuration from .env, filled in by load_config()
+DB_CONFIG = {}
+
+# Shared random generator, reseeded from MOCK_SEED by load_config()
+RNG = np.random.default_rng()
+
+
+def rng_from_env():
+    """Create a random generator, seeded from MOCK_SEED when it is set and non-zero"""
+    seed = os.getenv("MOCK_SEED", "").strip()
+    if not seed:
+        return np.random.default_rng()
+    if not seed.isdecimal():
+        raise ValueError(f"MOCK_SEED must be a non-negative integer, got {seed!r}")
+    return np.random.default_rng(int(seed) or None)
+
+
+def load_config():
+    """Load .env and read database settings and MOCK_SEED from the environment"""
+    global RNG
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    DB_CONFIG.update({
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5434'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'postgres'),
+        'database': os.getenv('DB_NAME', 'recon_db')
+    })
+    RNG = rng_from_env()
 
 
 def get_db_connection():
     """Create and return PostgreSQL database connection"""
+    import psycopg2
+
     try:
         conn = psycopg2.connect(**DB_CONFIG)
         return conn
@@ -53,26 +87,112 @@ def get_db_connection():
         raise
 
 
-def generate_transaction_id(index):
-    """Generate unique transaction ID"""
-    return f"TRX{index:08d}"
-
-
-def generate_random_amount():
-    """Generate random transaction amount between 10 and 10000"""
-    return round(random.uniform(10.0, 10000.0), 2)
-
-
-def generate_random_datetime(start_date, end_date):
-    """Generate random datetime between start and end dates"""
-    time_delta = end_date - start_date
-    random_seconds = random.randint(0, int(time_delta.total_seconds()))
-    return start_date + timedelta(seconds=random_seconds)
+class TransactionBatch(NamedTuple):
+    """System transactions stored column-wise, one array per field"""
+    trx_ids: np.ndarray
+    amounts: np.ndarray
+    types: np.ndarray
+    times: np.ndarray  # datetime64[s]
+
+    def take(self, indices):
+        """Return the rows at the given indices as a new batch"""
+        return TransactionBatch(*(column[indices] for column in self))
+
+
+class BankFileStats(NamedTuple):
+    """Row counts for one generated bank CSV file"""
+    rows_written: int
+    matched_rows: int
+    discrepancy_rows: int
+    unmatched_rows: int
+    error_rows: int
+
+
+def generate_transaction_ids(count):
+    """Generate unique transaction IDs for indexes 1..count"""
+    digits = np.arange(1, count + 1).astype(str)
+    return np.char.add("TRX", np.char.zfill(digits, 8))
+
+
+def generate_transactions(count):
+    """Generate random system transactions, all columns drawn in bulk"""
+    total_secs = int((END_DATE - START_DATE).total_seconds())
+    secs = RNG.integers(0, total_secs, count, endpoint=True)
+
+    return TransactionBatch(
+        trx_ids=generate_transaction_ids(count),
+        amounts=np.round(RNG.uniform(10.0, 10000.0, count), 2),
+        types=RNG.choice(TYPES, count),
+        times=np.datetime64(START_DATE, 's') + secs.astype('timedelta64[s]'),
+    )
+
+
+def iter_transaction_rows(transactions):
+    """Yield (trx_id, amount, type, timestamp) rows, converting COPY_CHUNK_ROWS rows at a time"""
+    for start in range(0, len(transactions.trx_ids), COPY_CHUNK_ROWS):
+        chunk = transactions.take(slice(start, start + COPY_CHUNK_ROWS))
+        yield from zip(
+            chunk.trx_ids.tolist(),
+            chunk.amounts.tolist(),
+            chunk.types.tolist(),
+            np.datetime_as_string(chunk.times).tolist(),
+        )
+
+
+def format_copy_rows(transactions):
+    """Yield COPY text-format lines for a transaction batch"""
+    for trx_id, amount, tx_type, ts in iter_transaction_rows(transactions):
+        yield f"{trx_id}\t{amount:.2f}\t{tx_type}\t{ts}\n"
+
+
+def copy_transactions(cursor, transactions):
+    """Bulk load transactions with COPY, skipping trx_ids that already exist"""
+    # COPY has no ON CONFLICT handling, so load a staging table and upsert
+    # from it
+    # Stage only the data columns: copying the SERIAL id default would burn
+    # a sequence value per staged row on top of the one the upsert takes
+    cursor.execute("""
+        CREATE TEMP TABLE _stg ON COMMIT DROP AS
+        SELECT trx_id, amount, type, transaction_time FROM transactions WITH NO DATA
+    """)
+
+    buf = io.StringIO()
+    buf.writelines(format_copy_rows(transactions))
+    buf.seek(0)
+    cursor.copy_expert(
+        "COPY _stg (trx_id, amount, type, transaction_time) FROM STDIN WITH (FORMAT text)",
+        buf
+    )
+    cursor.execute("""
+        INSERT INTO transactions (trx_id, amount, type, transaction_time)
+        SELECT trx_id, amount, type, transaction_time FROM _stg
+        ON CONFLICT (trx_id) DO NOTHING
+    """)
+
+
+def insert_transactions(cursor, transactions):
+    """Bulk insert transactions with multi-row INSERTs, for when COPY is not permitted"""
+    from psycopg2.extras import execute_values
+
+    execute_values(
+        cursor,
+        """
+        INSERT INTO transactions (trx_id, amount, type, transaction_time)
+        VALUES %s
+        ON CONFLICT (trx_id) DO NOTHING
+        """,
+        (
+            (trx_id, f"{amount:.2f}", tx_type, ts)
+            for trx_id, amount, tx_type, ts in iter_transaction_rows(transactions)
+        ),
+        page_size=10000
+    )
 
 
 def create_postgres_transactions():
     """Create transactions in PostgreSQL database"""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    import psycopg2
+    from psycopg2 import errors
 
     print(f"Connecting to PostgreSQL database at {DB_CONFIG['host']}:{DB_CONFIG['port']}...")
 
@@ -80,39 +200,28 @@ def create_postgres_transactions():
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        # The clear and the load run as one transaction; this is throwaway
+        # test data, so skip waiting on the WAL flush when it commits
+        cursor.execute("SET LOCAL synchronous_commit = off")
+        cursor.execute("SET LOCAL client_min_messages = warning")
+
         # Clear existing test data
         print(f"Clearing existing transactions...")
         cursor.execute("DELETE FROM transactions WHERE trx_id LIKE 'TRX%'")
-        conn.commit()
 
         print(f"Creating {NUM_TRANSACTIONS} system transactions...")
 
-        # Generate transactions
-        start_date = datetime(2024, 1, 1)
-        end_date = datetime(2024, 12, 31)
-
-        transactions = []
-        for i in range(1, NUM_TRANSACTIONS + 1):
-            trx_id = generate_transaction_id(i)
-            amount = generate_random_amount()
-            tx_type = random.choice(TYPES)
-            tx_time = generate_random_datetime(start_date, end_date)
-
-            transactions.append((
-                trx_id,
-                amount,
-                tx_type,
-                tx_time
-            ))
-
-        # Bulk insert using execute_batch for better performance
-        insert_query = """
-            INSERT INTO transactions (trx_id, amount, type, transaction_time)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (trx_id) DO NOTHING
-        """
-
-        execute_batch(cursor, insert_query, transactions, page_size=1000)
+        transactions = generate_transactions(NUM_TRANSACTIONS)
+
+        # Prefer COPY; fall back to multi-row INSERTs when the role may not
+        # create temp tables or COPY is rejected
+        cursor.execute("SAVEPOINT bulk_load")
+        try:
+            copy_transactions(cursor, transactions)
+        except (errors.FeatureNotSupported, errors.InsufficientPrivilege) as e:
+            print(f"COPY unavailable ({e.pgcode}), falling back to multi-row INSERT...")
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_load")
+            insert_transactions(cursor, transactions)
         conn.commit()
 
         # Get actual count
@@ -132,105 +241,128 @@ def create_postgres_transactions():
         raise
 
 
+def _write_bank_csv(csv_file, bank_name, bank_transactions, seed):
+    """Write one bank's CSV file from its share of the system transactions"""
+    rng = np.random.default_rng(seed)
+
+    # Fixed schema that never needs quoting, so rows are formatted directly
+    lines = ["trx_ref_id,amount,date\n"]
+
+    rows_written = 0
+    error_rows = 0
+    matched_rows = 0
+    unmatched_rows = 0
+    discrepancy_rows = 0
+
+    # Format every date and draw every error decision up front
+    date_strs = bank_transactions.times.astype('datetime64[D]').astype(str)
+    num_rows = len(bank_transactions.trx_ids)
+    error_mask = rng.random(num_rows) < ERROR_RATE
+    error_kinds = rng.integers(0, 4, num_rows)
+    discrepancy_deltas = rng.uniform(-100, 100, num_rows)
+
+    # Bank amounts: negative for debits, positive for credits
+    amounts = bank_transactions.amounts
+    signs = np.where(bank_transactions.types == "DEBIT", -1.0, 1.0)
+    amount_strs = [f"{amount:.2f}" for amount in (amounts * signs).tolist()]
+
+    rows = zip(bank_transactions.trx_ids.tolist(), amounts.tolist(), date_strs.tolist())
+    append = lines.append
+    for i, (trx_id, amount, date_str) in enumerate(rows):
+        # Introduce random errors
+        if error_mask[i]:
+            kind = error_kinds[i]
+
+            if kind == WRONG_FORMAT_AMOUNT:
+                # Invalid amount format
+                append(f"{trx_id},invalid_amount,{date_str}\n")
+                error_rows += 1
+            elif kind == WRONG_FORMAT_DATE:
+                # Invalid date format
+                append(f"{trx_id},{amount},2024-13-45\n")  # Invalid date
+                error_rows += 1
+            elif kind == MISSING_FIELD:
+                # Missing field
+                append(f"{trx_id},,{date_str}\n")
+                error_rows += 1
+            elif kind == AMOUNT_DISCREPANCY:
+                # Correct format but wrong amount
+                bank_amount = (amount + discrepancy_deltas[i]) * signs[i]
+                append(f"{trx_id},{bank_amount:.2f},{date_str}\n")
+                discrepancy_rows += 1
+        else:
+            # Correct matching transaction
+            append(f"{trx_id},{amount_strs[i]},{date_str}\n")
+            matched_rows += 1
+
+        rows_written += 1
+
+    # Add some unmatched bank transactions (not in system)
+    num_unmatched = int(ROWS_PER_BANK * 0.05)  # 5% unmatched
+    total_secs = int((END_DATE - START_DATE).total_seconds())
+    fake_amounts = rng.uniform(10.0, 10000.0, num_unmatched)
+    fake_secs = rng.integers(0, total_secs, num_unmatched, endpoint=True)
+    fake_dates = (
+        np.datetime64(START_DATE, 's') + fake_secs.astype('timedelta64[s]')
+    ).astype('datetime64[D]').astype(str)
+
+    # Row template built once per bank; map() calls the bound format
+    # method directly without a generator frame per row
+    fake_row_fmt = f"BANK_{bank_name.upper()}_{{:06d}},{{:.2f}},{{}}\n".format
+    lines.extend(map(fake_row_fmt, range(num_unmatched), fake_amounts.tolist(), fake_dates.tolist()))
+    unmatched_rows += num_unmatched
+    rows_written += num_unmatched
+
+    # Flush the whole file through one large buffered write
+    with open(csv_file, 'w', newline='', buffering=4 * 1024 * 1024, encoding='ascii') as f:
+        f.write("".join(lines))
+
+    return BankFileStats(rows_written, matched_rows, discrepancy_rows, unmatched_rows, error_rows)
+
+
 def create_bank_csv_files(system_transactions):
     """Create CSV files for each bank with some matching and some mismatched data"""
+    out = pathlib.Path(OUTPUT_DIR)
+    out.mkdir(parents=True, exist_ok=True)
 
-    # Shuffle and distribute transactions across banks
-    available_transactions = system_transactions.copy()
-    random.shuffle(available_transactions)
+    # Shuffle and distribute transactions across banks via an index
+    # permutation, so only each bank's own rows are ever copied
+    num_transactions = len(system_transactions.trx_ids)
+    perm = RNG.permutation(num_transactions)
 
+    # Each bank gets its own seed so output stays reproducible in workers
+    seeds = RNG.integers(0, 2**63, len(BANKS))
+
+    jobs = []
     for bank_index, bank_name in enumerate(BANKS):
-        csv_file = os.path.join(OUTPUT_DIR, f"{bank_name}.csv")
-
-        print(f"\nCreating {bank_name}.csv with ~{ROWS_PER_BANK} rows...")
-
-        with open(csv_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["trx_ref_id", "amount", "date"])
-
-            rows_written = 0
-            error_rows = 0
-            matched_rows = 0
-            unmatched_rows = 0
-            discrepancy_rows = 0
-
-            # Calculate how many transactions this bank should process
-            start_idx = bank_index * (len(available_transactions) // NUM_BANK_FILES)
-            end_idx = start_idx + ROWS_PER_BANK
-
-            bank_transactions = available_transactions[start_idx:end_idx]
-
-            for trx_id, amount, tx_type, tx_time in bank_transactions:
-                if rows_written >= ROWS_PER_BANK:
-                    break
-
-                # Parse transaction time
-                if isinstance(tx_time, str):
-                    tx_datetime = datetime.fromisoformat(tx_time)
-                else:
-                    tx_datetime = tx_time
-                date_str = tx_datetime.strftime("%Y-%m-%d")
-
-                # Introduce random errors
-                should_error = random.random() < ERROR_RATE
-
-                if should_error:
-                    error_type = random.choice([
-                        "wrong_format_amount",
-                        "wrong_format_date",
-                        "missing_field",
-                        "amount_discrepancy"
-                    ])
-
-                    if error_type == "wrong_format_amount":
-                        # Invalid amount format
-                        writer.writerow([trx_id, "invalid_amount", date_str])
-                        error_rows += 1
-                    elif error_type == "wrong_format_date":
-                        # Invalid date format
-                        writer.writerow([trx_id, amount, "2024-13-45"])  # Invalid date
-                        error_rows += 1
-                    elif error_type == "missing_field":
-                        # Missing field
-                        writer.writerow([trx_id, "", date_str])
-                        error_rows += 1
-                    elif error_type == "amount_discrepancy":
-                        # Correct format but wrong amount
-                        discrepancy_amount = amount + random.uniform(-100, 100)
-                        bank_amount = -discrepancy_amount if tx_type == "DEBIT" else discrepancy_amount
-                        writer.writerow([trx_id, f"{bank_amount:.2f}", date_str])
-                        discrepancy_rows += 1
-                else:
-                    # Correct matching transaction
-                    # Bank amounts: negative for debits, positive for credits
-                    bank_amount = -amount if tx_type == "DEBIT" else amount
-                    writer.writerow([trx_id, f"{bank_amount:.2f}", date_str])
-                    matched_rows += 1
-
-                rows_written += 1
-
-            # Add some unmatched bank transactions (not in system)
-            num_unmatched = int(ROWS_PER_BANK * 0.05)  # 5% unmatched
-            for i in range(num_unmatched):
-                fake_trx_id = f"BANK_{bank_name.upper()}_{i:06d}"
-                fake_amount = generate_random_amount()
-                fake_date = generate_random_datetime(
-                    datetime(2024, 1, 1),
-                    datetime(2024, 12, 31)
-                ).strftime("%Y-%m-%d")
-
-                writer.writerow([fake_trx_id, f"{fake_amount:.2f}", fake_date])
-                unmatched_rows += 1
-                rows_written += 1
-
-        print(f"  ✓ {rows_written} total rows")
-        print(f"  ✓ {matched_rows} matched transactions")
-        print(f"  ✓ {discrepancy_rows} discrepancies")
-        print(f"  ✓ {unmatched_rows} unmatched bank transactions")
-        print(f"  ✓ {error_rows} error rows (wrong format)")
+        # Calculate how many transactions this bank should process
+        start_idx = bank_index * (num_transactions // NUM_BANK_FILES)
+        end_idx = start_idx + ROWS_PER_BANK
+
+        bank_transactions = system_transactions.take(perm[start_idx:end_idx])
+        csv_file = out / f"{bank_name}.csv"
+        jobs.append((csv_file, bank_name, bank_transactions, int(seeds[bank_index])))
+
+    print(f"\nCreating {len(jobs)} bank CSV file(s) with ~{ROWS_PER_BANK} rows each...")
+
+    if len(jobs) > 1:
+        with Pool(min(len(jobs), os.cpu_count() or 1)) as pool:
+            results = pool.starmap(_write_bank_csv, jobs)
+    else:
+        results = [_write_bank_csv(*job) for job in jobs]
+
+    for bank_name, stats in zip(BANKS, results):
+        print(f"\n{bank_name}.csv")
+        print(f"  ✓ {stats.rows_written} total rows")
+        print(f"  ✓ {stats.matched_rows} matched transactions")
+        print(f"  ✓ {stats.discrepancy_rows} discrepancies")
+        print(f"  ✓ {stats.unmatched_rows} unmatched bank transactions")
+        print(f"  ✓ {stats.error_rows} error rows (wrong format)")
 
 
 def main():
+    load_config()
+
     print("=" * 60)
     print("Mock Data Generator for Transaction Reconciliation")
     print("=" * 60)